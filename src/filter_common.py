@@ -0,0 +1,210 @@
+from functools import lru_cache
+import io
+from itertools import islice, repeat
+import mmap
+import os
+from pathlib import Path
+import re
+import stat
+from typing import BinaryIO, Callable, FrozenSet, Iterable, List, Optional, Tuple
+
+MIN_RANGE_SIZE = 4 << 20  # Smallest input range handed to a worker process
+ATTRIBUTE_CACHE_SIZE = 1 << 12  # Distinct attribute tokens remembered per process
+WRITEV_BATCH = 256  # Buffers gathered into a single os.writev call
+
+# Bit flags for the analysis properties the criteria look at
+MASC, NEUT, FEM = 1, 2, 4
+SING = 8
+NOM, DAT, ACC = 16, 32, 64
+STRONG = 128
+GENDER = MASC | NEUT | FEM
+CASE = NOM | DAT | ACC
+
+TAG_BITS = {
+    b'masc': MASC, b'neut': NEUT, b'fem': FEM,
+    b'sing': SING,
+    b'nom': NOM, b'dat': DAT, b'acc': ACC,
+    b'strong': STRONG,
+}
+
+# Finds the properties listed in TAG_BITS among comma-separated ones
+TAG_RE = re.compile(rb'(?:^|,)(' + b'|'.join(TAG_BITS) + rb')(?=,|$)')
+
+# Maps ASCII upper case to lower case so tags match regardless of case
+LOWER_TABLE = bytes.maketrans(bytes(range(0x41, 0x5B)), bytes(range(0x61, 0x7B)))
+
+_NN = b'NN'
+_ADJ = b'ADJ'
+
+# Integer ids for the categories the criteria apply to
+NN_ID, ADJ_ID = 0, 1
+CATEGORY_IDS = {_NN: NN_ID, _ADJ: ADJ_ID}
+
+# An entry is a word line followed by its "lemma TAGS" analysis lines
+ENTRY_RE = re.compile(
+    rb'^[ \t]*(\S+)[ \t\r]*\n'
+    rb'((?:[ \t]*\S+ +\S[^\n]*(?:\n|\Z))+)',
+    re.MULTILINE,
+)
+
+# Lengths from MAX_LENGTH_BUCKET on share one table slot; no range reaches it
+MAX_LENGTH_BUCKET = 15
+
+# Lemma whitelists indexed by category id, i.e. (nouns, adjectives)
+Whitelists = Tuple[FrozenSet[bytes], FrozenSet[bytes]]
+
+@lru_cache(maxsize=ATTRIBUTE_CACHE_SIZE)
+def parse_attributes(attributes: bytes) -> Tuple[Optional[int], int]:
+    """Parse an attribute token into category id and property bitmask"""
+    # Reject other categories before scanning the properties
+    category, _, props = attributes.partition(b',')
+    category_id = CATEGORY_IDS.get(category)
+    if category_id is None:
+        return None, 0
+
+    mask = 0
+    for tag in TAG_RE.findall(props.translate(LOWER_TABLE)):
+        mask |= TAG_BITS[tag]
+    return category_id, mask
+
+def meets_adj_criteria(mask: int) -> bool:
+    """Check if property bitmask meets adjective criteria"""
+    if mask & (NOM | SING) != NOM | SING:
+        return False
+    return bool(mask & FEM or (mask & STRONG and mask & GENDER))
+
+def build_criteria_table(meets_criteria: Callable[[int, int, int], bool]) -> bytes:
+    """Evaluate meets_criteria once for every category, bitmask and length"""
+    # Index layout: category id, then the 8 property bits, then 4 length bits
+    table = bytearray(len(CATEGORY_IDS) << 12)
+    for category_id in CATEGORY_IDS.values():
+        for mask in range(256):
+            for length in range(MAX_LENGTH_BUCKET + 1):
+                index = category_id << 12 | mask << 4 | length
+                table[index] = meets_criteria(category_id, mask, length)
+    return bytes(table)
+
+def process_entry(word: bytes,
+                  analysis_lines: List[bytes],
+                  outfile: BinaryIO,
+                  criteria_table: bytes,
+                  whitelists: Optional[Whitelists] = None) -> None:
+    """Process a word entry and its analysis lines"""
+    valid_analyses = []
+    append = valid_analyses.append
+    # Only a few dozen attribute tokens occur, so their parse is cached
+    parse = parse_attributes
+
+    for line in analysis_lines:
+        # Only the lemma and the attribute token are needed
+        parts = line.split(None, 2)
+        if len(parts) < 2:  # Skip invalid lines
+            continue
+
+        lemma = parts[0]
+        category_id, mask = parse(parts[1])
+        if category_id is None:
+            continue
+
+        # Check if lemma is in the whitelist for its category
+        if whitelists is not None and lemma not in whitelists[category_id]:
+            continue
+
+        length = len(lemma.decode('utf-8'))  # Count characters, not bytes
+        if criteria_table[category_id << 12 | mask << 4 | min(length, MAX_LENGTH_BUCKET)]:
+            append(line.strip())  # Written without surrounding whitespace
+
+    # If we found valid analyses, write the word and its analyses
+    if valid_analyses:
+        outfile.write(word + b'\n' + b'\n'.join(valid_analyses) + b'\n\n')
+
+def split_ranges(data: mmap.mmap, parts: int) -> List[Tuple[int, int]]:
+    """Split the input into about `parts` byte ranges that end on blank lines"""
+    size = len(data)
+    step = max(size // parts, MIN_RANGE_SIZE)
+    ranges = []
+    start = 0
+    while start < size:
+        end = data.find(b'\n\n', start + step)
+        end = size if end == -1 else end + 2
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def filter_buffer(data: bytes, start: int, end: int,
+                  criteria_table: bytes,
+                  whitelists: Optional[Whitelists] = None) -> bytes:
+    """Filter the entries in a byte range of an in-memory or mapped input"""
+    outfile = io.BytesIO()
+    for entry in ENTRY_RE.finditer(data, start, end):
+        process_entry(entry.group(1), entry.group(2).splitlines(),
+                      outfile, criteria_table, whitelists)
+    return outfile.getvalue()
+
+def filter_range(input_path: Path, start: int, end: int,
+                 criteria_table: bytes,
+                 whitelists: Optional[Whitelists] = None) -> bytes:
+    """Filter the entries in a byte range of the input file"""
+    with input_path.open('rb') as infile, \
+         mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Have the kernel read the range in the background while it is
+        # filtered, instead of faulting pages in one at a time
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            offset = start - start % mmap.PAGESIZE
+            data.madvise(mmap.MADV_WILLNEED, offset, end - offset)
+        return filter_buffer(data, start, end, criteria_table, whitelists)
+
+def write_buffers(fd: int, buffers: Iterable[bytes]) -> None:
+    """Write buffers to a file descriptor, gathering up to WRITEV_BATCH per call"""
+    buffers = iter(buffers)
+    while True:
+        batch = list(islice(buffers, WRITEV_BATCH))
+        if not batch:
+            break
+        written = os.writev(fd, batch) if hasattr(os, 'writev') else 0
+        if written < sum(map(len, batch)):
+            # No writev on this platform, or a short write: finish with write()
+            rest = memoryview(b''.join(batch))[written:]
+            while rest:
+                rest = rest[os.write(fd, rest):]
+
+def filter_file(input_path: Path,
+                output_path: Path,
+                criteria_table: bytes,
+                whitelists: Optional[Whitelists] = None) -> None:
+    """Filter a dictionary file, splitting the work across CPU cores"""
+    contents = None
+    with input_path.open('rb') as infile:
+        st = os.fstat(infile.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            # Pipes and FIFOs cannot be mapped or reopened by workers
+            contents = infile.read()
+            ranges = []
+        elif not st.st_size:  # mmap cannot map an empty file
+            ranges = []
+        else:
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                ranges = split_ranges(data, os.cpu_count() or 1)
+
+    with output_path.open('wb', buffering=0) as outfile:
+        if contents is not None:
+            write_buffers(outfile.fileno(), [
+                filter_buffer(contents, 0, len(contents), criteria_table, whitelists)
+            ])
+        elif len(ranges) == 1:  # Not worth starting worker processes
+            start, end = ranges[0]
+            write_buffers(outfile.fileno(), [
+                filter_range(input_path, start, end, criteria_table, whitelists)
+            ])
+        elif ranges:
+            # Imported here as it pulls in multiprocessing and logging,
+            # which single-range runs never need
+            from concurrent.futures import ProcessPoolExecutor
+
+            starts, ends = zip(*ranges)
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                # map() yields results in order, so entries keep their order
+                write_buffers(outfile.fileno(),
+                              pool.map(filter_range, repeat(input_path),
+                                       starts, ends, repeat(criteria_table),
+                                       repeat(whitelists)))
@@ -1,116 +1,43 @@
 #!/usr/bin/env python3
 
-import logging
 from pathlib import Path
-from typing import List, Set, TextIO
 import sys
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+from filter_common import (
+    CASE, GENDER, NN_ID, SING, build_criteria_table, filter_file,
+    meets_adj_criteria,
+)
 
-def parse_analysis_line(analysis_line: str) -> tuple[str, str, Set[str]]:
-    """Parse a single analysis line into lemma, category, and properties"""
-    parts = analysis_line.split()
-    if len(parts) < 2:  # This is a word line, not an analysis line
-        return None, None, set()
-        
-    lemma, attributes = parts[0], parts[1]
-    attr_parts = attributes.split(',')
-    category = attr_parts[0]
-    properties = set(attr_parts[1:])
-    
-    return lemma, category, properties
-
-def meets_noun_criteria(properties: Set[str]) -> bool:
-    """Check if properties meet noun criteria"""
-    has_gender = any(gender in properties for gender in {'masc', 'neut', 'fem'})
-    has_sing = 'sing' in properties
-    has_case = any(case in properties for case in {'nom', 'dat', 'acc'})
-    return has_gender and has_sing and has_case
-
-def meets_adj_criteria(properties: Set[str]) -> bool:
-    """Check if properties meet adjective criteria"""
-    return (
-        (('nom' in properties) and
-        ('sing' in properties) and
-        ('strong' in properties) and
-        any(gender in properties for gender in {'masc', 'neut', 'fem'})) or 
-        ('nom' in properties) and
-        ('sing' in properties) and
-        ('fem' in properties)
-    )
-
-def meets_length_criteria(lemma: str, category: str) -> bool:
-    """Check if lemma meets length criteria based on category"""
-    length = len(lemma)
-    return (5 <= length <= 7) if category == 'NN' else (5 <= length <= 9)
-
-def process_entry(word: str, analysis_lines: List[str], outfile: TextIO) -> None:
-    """Process a word entry and its analysis lines"""
-    valid_analyses = []
-    
-    for line in analysis_lines:
-        lemma, category, properties = parse_analysis_line(line)
-        if not lemma:  # Skip invalid lines
-            continue
-            
-        if category not in {'NN', 'ADJ'}:
-            continue
+def meets_noun_criteria(mask: int) -> bool:
+    """Check if property bitmask meets noun criteria"""
+    return bool(mask & GENDER and mask & SING and mask & CASE)
 
-        meets_criteria = (
-            (category == 'NN' and meets_noun_criteria(properties)) or
-            (category == 'ADJ' and meets_adj_criteria(properties))
-        )
+def meets_length_criteria(length: int, category_id: int) -> bool:
+    """Check if lemma length meets length criteria based on category"""
+    return (5 <= length <= 7) if category_id == NN_ID else (5 <= length <= 9)
 
-        if meets_criteria and meets_length_criteria(lemma, category):
-            valid_analyses.append(line)
+def meets_criteria(category_id: int, mask: int, length: int) -> bool:
+    """Check if a preparsed analysis meets the criteria for its category"""
+    if category_id == NN_ID:
+        meets_category = meets_noun_criteria(mask)
+    else:
+        meets_category = meets_adj_criteria(mask)
+    return meets_category and meets_length_criteria(length, category_id)
 
-    # If we found valid analyses, write the word and its analyses
-    if valid_analyses:
-        outfile.write(f"{word}\n")
-        for analysis in valid_analyses:
-            outfile.write(f"{analysis}\n")
-        outfile.write("\n")
+CRITERIA_TABLE = build_criteria_table(meets_criteria)
 
 def filter_dictionary(input_path: Path, output_path: Path) -> None:
     """Filter the dictionary file according to specified criteria"""
-    logger.info(f"Starting to process {input_path}")
+    print(f"Starting to process {input_path}", file=sys.stderr)
     
     try:
-        with input_path.open('r', encoding='utf-8') as infile, \
-             output_path.open('w', encoding='utf-8') as outfile:
-            
-            current_word = None
-            current_analyses = []
-            
-            for line in infile:
-                line = line.strip()
-                
-                if not line:  # Empty line
-                    if current_word and current_analyses:
-                        process_entry(current_word, current_analyses, outfile)
-                    current_word = None
-                    current_analyses = []
-                    continue
-                
-                if ' ' not in line:  # This is a word line
-                    if current_word and current_analyses:
-                        process_entry(current_word, current_analyses, outfile)
-                    current_word = line
-                    current_analyses = []
-                else:  # This is an analysis line
-                    current_analyses.append(line)
-            
-            # Process the last entry if exists
-            if current_word and current_analyses:
-                process_entry(current_word, current_analyses, outfile)
+        filter_file(input_path, output_path, CRITERIA_TABLE)
     
     except Exception as e:
-        logger.error(f"Error processing files: {e}")
+        print(f"Error processing files: {e}", file=sys.stderr)
         raise
 
-    logger.info(f"Filtering completed. Output written to {output_path}")
+    print(f"Filtering completed. Output written to {output_path}", file=sys.stderr)
 
 def main():
     if len(sys.argv) != 3:
@@ -121,13 +48,13 @@ def main():
     output_path = Path(sys.argv[2])
 
     if not input_path.exists():
-        logger.error(f"Input file {input_path} does not exist")
+        print(f"Input file {input_path} does not exist", file=sys.stderr)
         sys.exit(1)
 
     try:
         filter_dictionary(input_path, output_path)
     except Exception as e:
-        logger.error(f"An error occurred: {e}")
+        print(f"An error occurred: {e}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == "__main__":